@@ -0,0 +1,51 @@
+"""
+Shared pytest fixtures for the stock data processor checks.
+"""
+import pandas as pd
+import numpy as np
+import pytest
+
+
+@pytest.fixture(scope="session")
+def daily_frame():
+    """
+    Daily OHLCV data for three tickers over their first 50 business days of 2022.
+    
+    Built once per session and shared by the checks, which must not modify it.
+    Prices rise by one each day, so the first, last, highest and lowest rows
+    of a month are all different, and each ticker is offset by another 1000
+    so rows from different tickers never match.
+    
+    Returns:
+        DataFrame indexed by date with ticker, open, high, low, close,
+        adjclose and volume columns
+    """
+    tickers = ['AAPL', 'AMD', 'MSFT']
+    dates = pd.bdate_range('2022-01-01', '2022-12-31')[:50]
+    
+    # Fill a typed record array column by column: the 50 days repeat per ticker
+    records = np.empty(len(tickers) * len(dates), dtype=np.dtype([
+        ('date', 'datetime64[ns]'),
+        ('ticker', 'U4'),
+        ('open', 'i8'),
+        ('high', 'i8'),
+        ('low', 'i8'),
+        ('close', 'i8'),
+        ('volume', 'i8')
+    ]))
+    base = (np.tile(np.arange(len(dates), dtype=np.int64), len(tickers))
+            + 1000 * np.repeat(np.arange(len(tickers), dtype=np.int64), len(dates)))
+    records['date'] = np.tile(dates.to_numpy(), len(tickers))
+    records['ticker'] = np.repeat(tickers, len(dates))
+    records['open'] = 100 + base
+    records['high'] = 105 + base
+    records['low'] = 95 + base
+    records['close'] = 102 + base
+    records['volume'] = 1_000_000
+    
+    df = pd.DataFrame.from_records(records, index='date')
+    df['ticker'] = pd.Categorical(df['ticker'], categories=tickers)
+    
+    # Adjusted close equals close here; copy-on-write shares the data until written
+    df['adjclose'] = df['close']
+    return df
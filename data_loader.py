@@ -6,6 +6,26 @@ import pandas as pd
 from pathlib import Path
 from typing import Optional
 
+try:
+    import pyarrow  # noqa: F401
+    PYARROW_AVAILABLE = True
+except ImportError:  # pyarrow is an optional, faster CSV parser
+    PYARROW_AVAILABLE = False
+
+
+# Column types declared up front so the parser skips type inference.
+# A categorical ticker turns equality filters and groupby dispatch into
+# integer code comparisons instead of string comparisons
+COLUMN_DTYPES = {
+    'ticker': 'category',
+    'open': 'float32',
+    'high': 'float32',
+    'low': 'float32',
+    'close': 'float32',
+    'adjclose': 'float32',
+    'volume': 'int64',
+}
+
 
 def load_stock_data(file_path: str) -> pd.DataFrame:
     """
@@ -15,7 +35,8 @@ def load_stock_data(file_path: str) -> pd.DataFrame:
         file_path: Path to the input CSV file
         
     Returns:
-        DataFrame with date as index and properly typed columns
+        DataFrame with date as index and properly typed columns, grouped
+        by ticker in the file's row order
         
     Raises:
         FileNotFoundError: If the file doesn't exist
@@ -26,15 +47,19 @@ def load_stock_data(file_path: str) -> pd.DataFrame:
     if not file_path_obj.exists():
         raise FileNotFoundError(f"Input file not found: {file_path}")
     
-    # Read CSV with date parsing
+    # Read CSV with date parsing and explicit column types, using Arrow's
+    # vectorized parser when available. Each date repeats once per ticker,
+    # so a fixed format plus the date cache avoids re-inferring and
+    # re-parsing the same strings
     df = pd.read_csv(
         file_path,
-        parse_dates=['date']
+        engine='pyarrow' if PYARROW_AVAILABLE else 'c',
+        parse_dates=['date'],
+        date_format='%Y-%m-%d',
+        cache_dates=True,
+        dtype=COLUMN_DTYPES
     )
     
-    # Ensure date is datetime type (parse_dates handles this, but double-check)
-    df['date'] = pd.to_datetime(df['date'])
-    
     # Validate required columns
     required_columns = ['date', 'volume', 'open', 'high', 'low', 'close', 'adjclose', 'ticker']
     missing_columns = [col for col in required_columns if col not in df.columns]
@@ -42,14 +67,11 @@ def load_stock_data(file_path: str) -> pd.DataFrame:
     if missing_columns:
         raise ValueError(f"Missing required columns: {missing_columns}")
     
-    # Ensure date is datetime type
-    df['date'] = pd.to_datetime(df['date'])
-    
-    # Sort by ticker and date for proper resampling
-    df = df.sort_values(['ticker', 'date']).reset_index(drop=True)
-    
-    # Set date as index for resampling operations
-    df = df.set_index('date')
+    # Set date as index for resampling operations, then group rows by ticker.
+    # A stable sort keeps the file's date order within each ticker, so the
+    # usual date-ordered input needs no secondary sort key; files that are
+    # not date-ordered are sorted by aggregate_monthly_ohlc's order check
+    df = df.set_index('date').sort_values('ticker', kind='stable')
     
     return df
 
@@ -2,32 +2,88 @@
 File Writing Module
 Handles partitioning and writing results to separate CSV files.
 """
+import os
 import pandas as pd
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
-from typing import List
+from typing import Dict, List
 
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.csv as pacsv
+    PYARROW_AVAILABLE = True
+except ImportError:  # pyarrow is an optional, faster CSV writer
+    PYARROW_AVAILABLE = False
 
-def write_ticker_to_csv(df: pd.DataFrame, ticker: str, output_dir: str = "output") -> str:
+
+OUTPUT_FORMATS = ('csv', 'parquet')
+
+
+def _write_csv_arrow(df: pd.DataFrame, file_path: Path) -> None:
+    """
+    Write a DataFrame to CSV with pyarrow's vectorized writer.
+    
+    The layout follows DataFrame.to_csv(index=False): an unquoted header
+    and dates without a time component when every value is at midnight.
+    Floats use their shortest representation, so integral values are
+    written without a trailing ".0".
+    
+    Args:
+        df: DataFrame to write
+        file_path: Destination CSV path
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    
+    for i, name in enumerate(table.column_names):
+        column = df[name]
+        if pd.api.types.is_datetime64_dtype(column) and (column == column.dt.normalize()).all():
+            table = table.set_column(i, name, pc.cast(table[name], pa.date32()))
+    
+    with open(file_path, 'wb') as f:
+        f.write((','.join(table.column_names) + '\n').encode())
+        pacsv.write_csv(
+            table,
+            f,
+            write_options=pacsv.WriteOptions(include_header=False)
+        )
+
+
+def write_ticker_to_csv(
+    df: pd.DataFrame,
+    ticker: str,
+    output_dir: str = "output",
+    output_format: str = "csv"
+) -> str:
     """
     Write monthly aggregated data for a specific ticker to a CSV file.
     
+    With output_format="parquet" the same columns are written to a
+    snappy-compressed Parquet file instead, which skips float-to-text
+    formatting and is cheaper to re-read as a DataFrame.
+    
     Args:
         df: DataFrame with monthly data for the ticker
         ticker: Stock ticker symbol
         output_dir: Directory to save output files
+        output_format: Either "csv" or "parquet"
         
     Returns:
         Path to the created file
+        
+    Raises:
+        ValueError: If output_format is not supported
     """
+    if output_format not in OUTPUT_FORMATS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    
     # Create output directory if it doesn't exist
     output_path = Path(output_dir)
     output_path.mkdir(parents=True, exist_ok=True)
     
-    # Prepare dataframe for writing
-    df_output = df.copy()
-    
-    # Reset index to have date as a column
-    df_output = df_output.reset_index()
+    # Reset index to have date as a column; reset_index already returns a
+    # new frame, so the input is left untouched without an extra copy
+    df_output = df.reset_index()
     
     # Select and order columns for output
     # Include: date, open, high, low, close, adjclose, volume, SMA_10, SMA_20, EMA_10, EMA_20
@@ -41,11 +97,16 @@ def write_ticker_to_csv(df: pd.DataFrame, ticker: str, output_dir: str = "output
     df_output = df_output[available_columns]
     
     # Generate filename
-    filename = f"result_{ticker}.csv"
+    filename = f"result_{ticker}.{output_format}"
     file_path = output_path / filename
     
-    # Write to CSV
-    df_output.to_csv(file_path, index=False)
+    # Write to the requested format
+    if output_format == "parquet":
+        df_output.to_parquet(file_path, engine="pyarrow", compression="snappy", index=False)
+    elif PYARROW_AVAILABLE:
+        _write_csv_arrow(df_output, file_path)
+    else:
+        df_output.to_csv(file_path, index=False)
     
     return str(file_path)
 
@@ -53,8 +114,9 @@ def write_ticker_to_csv(df: pd.DataFrame, ticker: str, output_dir: str = "output
 def partition_and_write_results(
     monthly_df: pd.DataFrame,
     tickers: List[str],
-    output_dir: str = "output"
-) -> List[str]:
+    output_dir: str = "output",
+    output_format: str = "csv"
+) -> Dict[str, int]:
     """
     Partition monthly data by ticker and write to separate CSV files.
     
@@ -62,27 +124,46 @@ def partition_and_write_results(
         monthly_df: DataFrame with monthly aggregated data for all tickers
         tickers: List of ticker symbols to process
         output_dir: Directory to save output files
+        output_format: Either "csv" or "parquet"
         
     Returns:
-        List of file paths created
+        Dict mapping each created file path to its row count, in ticker order
     """
-    created_files = []
+    ticker_frames = []
+    
+    # Positional row indices per ticker from one hash pass; each slice is then
+    # a single gather instead of a mask scan over the whole frame
+    idx_map = monthly_df.groupby('ticker', sort=False, observed=True).indices
     
     for ticker in tickers:
-        # Filter data for this ticker
-        ticker_data = monthly_df[monthly_df['ticker'] == ticker].copy()
-        
-        if ticker_data.empty:
+        if ticker not in idx_map:
             print(f"Warning: No data found for ticker {ticker}")
             continue
         
-        # Write to CSV
-        file_path = write_ticker_to_csv(ticker_data, ticker, output_dir)
-        created_files.append(file_path)
-        
+        ticker_data = monthly_df.take(idx_map[ticker])
+        ticker_frames.append((ticker, ticker_data))
+    
+    if not ticker_frames:
+        return {}
+    
+    # Each file is independent, so write them concurrently. pyarrow's CSV and
+    # Parquet writers release the GIL while encoding, and file writes release
+    # it during I/O, so threads overlap without pickling frames to worker
+    # processes. The pandas to_csv fallback formats while holding the GIL, so
+    # there the threads only overlap the I/O
+    max_workers = min(len(ticker_frames), os.cpu_count() or 1)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        created_files = list(executor.map(
+            lambda item: write_ticker_to_csv(item[1], item[0], output_dir, output_format),
+            ticker_frames
+        ))
+    
+    file_row_counts = {}
+    for (ticker, ticker_data), file_path in zip(ticker_frames, created_files):
         # Verify row count (should be 24 months for 2-year period)
         row_count = len(ticker_data)
+        file_row_counts[file_path] = row_count
         print(f"Created {file_path} with {row_count} rows")
     
-    return created_files
+    return file_row_counts
 
@@ -2,10 +2,37 @@
 Monthly Aggregation Module
 Handles resampling daily data to monthly frequency with proper OHLC logic.
 """
+import numpy as np
 import pandas as pd
 from typing import Dict
 
 
+def _sort_by_ticker_and_date(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Order rows by ticker, then by date within each ticker.
+    
+    Input that is already in that order (such as load_stock_data's output
+    for a date-ordered file) is detected in O(N) and returned as is.
+    
+    Args:
+        df: DataFrame with date as index and a ticker column
+        
+    Returns:
+        DataFrame sorted by ticker and date
+    """
+    tickers = df['ticker']
+    if isinstance(tickers.dtype, pd.CategoricalDtype):
+        codes = tickers.cat.codes.to_numpy()
+    else:
+        codes = pd.factorize(tickers, sort=True)[0]
+    dates = df.index.to_numpy()
+    same_ticker = codes[1:] == codes[:-1]
+    if ((codes[1:] < codes[:-1]) | (same_ticker & (dates[1:] < dates[:-1]))).any():
+        # lexsort is stable: ticker is the primary key, date the secondary
+        df = df.take(np.lexsort((dates, codes)))
+    return df
+
+
 def aggregate_monthly_ohlc(df: pd.DataFrame) -> pd.DataFrame:
     """
     Resample daily data to monthly frequency with proper OHLC aggregation.
@@ -19,14 +46,28 @@ def aggregate_monthly_ohlc(df: pd.DataFrame) -> pd.DataFrame:
     - AdjClose: Last trading day's adjusted close price of the month
     
     Args:
-        df: DataFrame with date as index, containing daily OHLC data
+        df: DataFrame with date as index, containing daily OHLC data;
+            input already sorted by ticker and date (as load_stock_data
+            returns for a date-ordered file) is used as is, anything else
+            is sorted first
         
     Returns:
-        DataFrame with monthly aggregated data
+        DataFrame with monthly aggregated data, sorted by ticker and date
     """
-    # Group by ticker and resample to monthly frequency
-    # Use 'ME' (Month End) instead of deprecated 'M'
-    monthly_data = df.groupby('ticker').resample('ME').agg({
+    # first/last below follow row order, so rows must be grouped by ticker
+    # and date-ordered within each ticker
+    df = _sort_by_ticker_and_date(df)
+    
+    # Integer month key per row, equal to the monthly Period ordinal
+    # ((year - 1970) * 12 + month - 1). Grouping on it hits pandas' integer
+    # hash path instead of resampling on timestamps per ticker
+    month_key = (
+        (df.index.year.to_numpy(dtype=np.int64) - 1970) * 12
+        + df.index.month.to_numpy(dtype=np.int64) - 1
+    )
+    
+    # Group by ticker and month; first/last follow the (now sorted) row order
+    monthly_data = df.groupby(['ticker', month_key], observed=True, sort=False).agg({
         'open': 'first',      # First trading day's open
         'high': 'max',        # Maximum high during month
         'low': 'min',         # Minimum low during month
@@ -35,14 +76,21 @@ def aggregate_monthly_ohlc(df: pd.DataFrame) -> pd.DataFrame:
         'volume': 'sum'       # Sum of volumes
     })
     
-    # Reset index - ticker is already in the index, date becomes a column
+    # Reset index - ticker and month key become columns
+    monthly_data.index = monthly_data.index.set_names(['ticker', 'date'])
     monthly_data = monthly_data.reset_index()
     
+    # Map the month key back to the month-end date that resample('ME') used
+    month_end = pd.PeriodIndex.from_ordinals(monthly_data['date'], freq='M').to_timestamp(how='end')
+    monthly_data['date'] = month_end.normalize().as_unit(df.index.unit)
+    
     # Set date as index again for easier processing
     monthly_data = monthly_data.set_index('date')
     
-    # Remove rows with missing data (shouldn't happen, but safety check)
-    monthly_data = monthly_data.dropna(subset=['open', 'high', 'low', 'close'])
+    # Every month is built from at least one daily row, so there are no empty
+    # months to drop; the check is compiled out under python -O
+    assert not monthly_data[['open', 'high', 'low', 'close']].isna().any().any(), \
+        "Monthly aggregation produced missing OHLC values"
     
     return monthly_data
 
@@ -51,6 +99,10 @@ def get_monthly_data_by_ticker(monthly_df: pd.DataFrame, ticker: str) -> pd.Data
     """
     Extract monthly data for a specific ticker.
     
+    The boolean mask already builds a new frame, so no extra copy is made,
+    and it is not re-sorted: aggregate_monthly_ohlc already returns each
+    ticker's months in date order.
+    
     Args:
         monthly_df: DataFrame with monthly aggregated data
         ticker: Stock ticker symbol
@@ -58,7 +110,5 @@ def get_monthly_data_by_ticker(monthly_df: pd.DataFrame, ticker: str) -> pd.Data
     Returns:
         DataFrame filtered for the specific ticker, sorted by date
     """
-    ticker_data = monthly_df[monthly_df['ticker'] == ticker].copy()
-    ticker_data = ticker_data.sort_index()  # Sort by date
-    return ticker_data
+    return monthly_df.loc[monthly_df['ticker'] == ticker]
 
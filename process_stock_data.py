@@ -9,7 +9,6 @@ This script:
 4. Partitions results into separate CSV files (one per ticker)
 """
 import sys
-import pandas as pd
 from pathlib import Path
 
 from stock_data_processor import (
@@ -67,17 +66,13 @@ def main(input_file: str, output_dir: str = "output"):
     # Step 4: Calculate technical indicators
     print(f"\n[Step 4] Calculating technical indicators...")
     try:
-        # Group by ticker and calculate indicators for each
-        monthly_with_indicators = []
-        
-        for ticker in EXPECTED_TICKERS:
-            ticker_data = df_monthly[df_monthly['ticker'] == ticker].copy()
-            
-            if not ticker_data.empty:
-                ticker_data = add_technical_indicators(ticker_data)
-                monthly_with_indicators.append(ticker_data)
-        
-        df_monthly_final = pd.concat(monthly_with_indicators, ignore_index=False)
+        # Group by ticker and calculate indicators for each in a single pass;
+        # selecting all columns keeps 'ticker' in every group
+        df_monthly_final = (
+            df_monthly
+            .groupby('ticker', observed=True, sort=False, group_keys=False)[df_monthly.columns]
+            .apply(add_technical_indicators)
+        )
         print(f"[OK] Added SMA 10, SMA 20, EMA 10, and EMA 20 indicators")
     except Exception as e:
         print(f"[ERROR] Error calculating indicators: {e}")
@@ -88,20 +83,20 @@ def main(input_file: str, output_dir: str = "output"):
     # Step 5: Partition and write results
     print(f"\n[Step 5] Partitioning and writing results to {output_dir}/...")
     try:
-        created_files = partition_and_write_results(
+        file_row_counts = partition_and_write_results(
             df_monthly_final,
             EXPECTED_TICKERS,
             output_dir
         )
-        print(f"\n[OK] Successfully created {len(created_files)} output files")
+        print(f"\n[OK] Successfully created {len(file_row_counts)} output files")
         
         # Summary
         print("\n" + "=" * 60)
         print("Processing Summary")
         print("=" * 60)
-        for file_path in sorted(created_files):
-            df_check = pd.read_csv(file_path)
-            print(f"  {Path(file_path).name}: {len(df_check)} rows")
+        # Row counts come from the written frames, so no file is re-read
+        for file_path, row_count in sorted(file_row_counts.items()):
+            print(f"  {Path(file_path).name}: {row_count} rows")
         print("=" * 60)
         
     except Exception as e:
@@ -1,10 +1,173 @@
 """
 Technical Indicators Module
-Calculates SMA and EMA using vectorized pandas operations.
+Calculates SMA and EMA using vectorized pandas operations, with optional
+Numba-compiled kernels when numba is installed.
 """
+import os
 import pandas as pd
 import numpy as np
 
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:  # numba is an optional accelerator
+    NUMBA_AVAILABLE = False
+
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit so kernels still run as plain Python."""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+
+@njit(cache=True, nogil=True)
+def _ema_kernel(x, window, alpha):
+    """
+    Compute the SMA-seeded EMA recurrence over a float array.
+    
+    The recurrence state is kept in float64; results are stored in the
+    input's dtype, so float32 prices stay float32.
+    
+    Args:
+        x: 1-D float32 or float64 array of prices
+        window: Number of periods
+        alpha: Smoothing multiplier, 2 / (window + 1)
+        
+    Returns:
+        1-D array with EMA values, same dtype as x
+    """
+    n = x.shape[0]
+    out = np.empty_like(x)
+    
+    # Running sum for the initial SMA over the first 'window' samples; NaNs
+    # are skipped, as rolling(min_periods=1).mean() does
+    total = 0.0
+    count = 0
+    for i in range(min(n, window)):
+        if not np.isnan(x[i]):
+            total += x[i]
+            count += 1
+        if i < window - 1:
+            # Before we have enough periods, use price itself
+            out[i] = x[i]
+        else:
+            # At the window-th period, use SMA as initial EMA
+            out[i] = total / count if count > 0 else np.nan
+    
+    if n < window:
+        return out
+    
+    # Apply EMA formula: EMA = (Price - Previous EMA) * alpha + Previous EMA;
+    # a NaN price makes this and every later EMA NaN
+    ema = total / count if count > 0 else np.nan
+    for i in range(window, n):
+        ema = alpha * (x[i] - ema) + ema
+        out[i] = ema
+    
+    return out
+
+
+@njit(cache=True, nogil=True)
+def _all_indicators(close, out_sma10, out_sma20, out_ema10, out_ema20):
+    """
+    Compute SMA 10, SMA 20, EMA 10, and EMA 20 in a single pass over close.
+    
+    Keeps two running sums (subtracting the value leaving each window) and
+    two EMA recurrences, writing results into the preallocated outputs.
+    SMA values before a window is full average the available periods.
+    Running state is float64 whatever the dtype of close and the outputs.
+    
+    Args:
+        close: 1-D float32 or float64 array of closing prices
+        out_sma10: Output array for SMA 10
+        out_sma20: Output array for SMA 20
+        out_ema10: Output array for EMA 10
+        out_ema20: Output array for EMA 20
+    """
+    alpha10 = 2.0 / 11.0
+    alpha20 = 2.0 / 21.0
+    s10 = 0.0
+    s20 = 0.0
+    e10 = 0.0
+    e20 = 0.0
+    
+    for i in range(close.shape[0]):
+        x = close[i]
+        s10 += x
+        s20 += x
+        if i >= 10:
+            s10 -= close[i - 10]
+        if i >= 20:
+            s20 -= close[i - 20]
+        
+        out_sma10[i] = s10 / min(i + 1, 10)
+        out_sma20[i] = s20 / min(i + 1, 20)
+        
+        # EMA: price itself, then SMA seed at the window-th period, then recurrence
+        if i < 9:
+            e10 = x
+        elif i == 9:
+            e10 = s10 / 10.0
+        else:
+            e10 = alpha10 * (x - e10) + e10
+        
+        if i < 19:
+            e20 = x
+        elif i == 19:
+            e20 = s20 / 20.0
+        else:
+            e20 = alpha20 * (x - e20) + e20
+        
+        out_ema10[i] = e10
+        out_ema20[i] = e20
+
+
+def _float_dtype(series: pd.Series) -> np.dtype:
+    """
+    Return the float dtype indicator results use for a price series.
+    
+    Args:
+        series: Series of prices
+        
+    Returns:
+        float32 for float32 input, float64 otherwise
+    """
+    return np.dtype(np.float32) if series.dtype == np.float32 else np.dtype(np.float64)
+
+
+def _float_values(series: pd.Series) -> np.ndarray:
+    """
+    Return series values as a float array, keeping float32 without upcasting.
+    
+    Args:
+        series: Series of prices
+        
+    Returns:
+        1-D float32 array for float32 input, float64 array otherwise
+    """
+    return series.to_numpy(dtype=_float_dtype(series))
+
+
+def _sma_cumsum(arr: np.ndarray, window: int) -> np.ndarray:
+    """
+    Compute the SMA in O(N) from the difference of a cumulative sum.
+    
+    Periods before the window is full are averaged over the available
+    values, matching rolling(window, min_periods=1).mean().
+    
+    Args:
+        arr: 1-D array of prices, at least 'window' long
+        window: Number of periods
+        
+    Returns:
+        1-D float64 array with SMA values
+    """
+    c = np.cumsum(arr, dtype=np.float64)
+    out = np.empty(arr.shape[0], dtype=np.float64)
+    out[:window - 1] = c[:window - 1] / np.arange(1, window)
+    out[window - 1:] = (c[window - 1:] - np.concatenate(([0.0], c[:-window]))) / window
+    return out
+
 
 def calculate_sma(series: pd.Series, window: int) -> pd.Series:
     """
@@ -17,9 +180,18 @@ def calculate_sma(series: pd.Series, window: int) -> pd.Series:
         window: Number of periods (e.g., 10 or 20)
         
     Returns:
-        Series with SMA values
+        Series with SMA values; float32 for float32 input, float64 otherwise
     """
-    return series.rolling(window=window, min_periods=1).mean()
+    dtype = _float_dtype(series)
+    
+    # For long series the cumulative-sum difference beats a rolling scan;
+    # NaNs poison the cumulative sum, so those series keep using rolling()
+    if len(series) > 4 * window:
+        result = _sma_cumsum(series.to_numpy(dtype=np.float64), window)
+        if np.isfinite(result[-1]):
+            return pd.Series(result.astype(dtype, copy=False), index=series.index)
+    
+    return series.rolling(window=window, min_periods=1).mean().astype(dtype)
 
 
 def calculate_ema(series: pd.Series, window: int) -> pd.Series:
@@ -36,34 +208,36 @@ def calculate_ema(series: pd.Series, window: int) -> pd.Series:
         window: Number of periods (e.g., 10 or 20)
         
     Returns:
-        Series with EMA values
+        Series with EMA values; float32 for float32 input, float64 otherwise
     """
     # Calculate multiplier (smoothing constant) as per specification
     # alpha = 2 / (N + 1)
     alpha = 2.0 / (window + 1.0)
     
-    # Initialize EMA series
-    ema = pd.Series(index=series.index, dtype=float)
+    if NUMBA_AVAILABLE:
+        result = _ema_kernel(_float_values(series), window, alpha)
+        return pd.Series(result, index=series.index)
     
-    # Calculate SMA for first 'window' periods to use as initial EMA value
-    sma_initial = series.rolling(window=window, min_periods=1).mean()
+    # Without numba, seed pandas' C-level ewm with the initial SMA.
+    # Before we have enough periods, the EMA is the price itself.
+    # The recurrence runs in float64, like the kernel's running state
+    dtype = _float_dtype(series)
+    seeded = series.astype(np.float64)
+    if len(seeded) < window:
+        return seeded.astype(dtype)
     
-    # For periods before we have enough data for SMA, use the price itself
-    # Once we have 'window' periods, use SMA as the starting point
-    for i in range(len(series)):
-        if i < window - 1:
-            # Before we have enough periods, use price itself
-            ema.iloc[i] = series.iloc[i]
-        elif i == window - 1:
-            # At the window-th period, use SMA as initial EMA
-            ema.iloc[i] = sma_initial.iloc[i]
-        else:
-            # Apply EMA formula: EMA = (Price - Previous EMA) * alpha + Previous EMA
-            prev_ema = ema.iloc[i - 1]
-            current_price = series.iloc[i]
-            ema.iloc[i] = (current_price - prev_ema) * alpha + prev_ema
+    seeded.iloc[window - 1] = series.iloc[:window].mean()
+    tail_in = seeded.iloc[window - 1:]
+    tail = tail_in.ewm(alpha=alpha, adjust=False).mean().to_numpy(copy=True)
     
-    return ema
+    # ewm carries the last value across NaNs, but the recurrence (and the
+    # Numba kernel) turns NaN from the first missing value onward
+    missing = np.flatnonzero(np.isnan(tail_in.to_numpy()))
+    if missing.size:
+        tail[missing[0]:] = np.nan
+    seeded.iloc[window - 1:] = tail
+    
+    return seeded.astype(dtype)
 
 
 def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
@@ -78,16 +252,37 @@ def add_technical_indicators(df: pd.DataFrame) -> pd.DataFrame:
     Returns:
         DataFrame with added technical indicator columns
     """
-    df = df.copy()
-    
-    # Ensure data is sorted by date
+    # Ensure data is sorted by date; sort_index and assign both return new
+    # frames, so the input is never mutated and no defensive copy is needed
     df = df.sort_index()
     
     # Calculate technical indicators based on closing prices
-    df['SMA_10'] = calculate_sma(df['close'], window=10)
-    df['SMA_20'] = calculate_sma(df['close'], window=20)
-    df['EMA_10'] = calculate_ema(df['close'], window=10)
-    df['EMA_20'] = calculate_ema(df['close'], window=20)
+    if NUMBA_AVAILABLE:
+        close = _float_values(df['close'])
+        n = len(close)
+        sma_10, sma_20 = np.empty_like(close), np.empty_like(close)
+        ema_10, ema_20 = np.empty_like(close), np.empty_like(close)
+        _all_indicators(close, sma_10, sma_20, ema_10, ema_20)
+        
+        # A NaN close poisons the running sums; fall back to calculate_sma and
+        # calculate_ema, which skip NaNs in the SMA and the EMA seed
+        if n == 0 or np.isfinite(sma_10[-1]):
+            return df.assign(SMA_10=sma_10, SMA_20=sma_20, EMA_10=ema_10, EMA_20=ema_20)
     
-    return df
+    return df.assign(
+        SMA_10=calculate_sma(df['close'], window=10),
+        SMA_20=calculate_sma(df['close'], window=20),
+        EMA_10=calculate_ema(df['close'], window=10),
+        EMA_20=calculate_ema(df['close'], window=20)
+    )
+
 
+# Compile the kernels at import for the float dtypes the pipeline uses, so the
+# first indicator call doesn't pay JIT latency; with cache=True later imports
+# load the compiled code from disk. Set SDP_WARMUP=0 to skip.
+if NUMBA_AVAILABLE and os.environ.get("SDP_WARMUP", "1") == "1":
+    for _dtype in (np.float32, np.float64):
+        _warmup = np.zeros(32, dtype=_dtype)
+        _ema_kernel(_warmup, 10, 2.0 / 11.0)
+        _all_indicators(_warmup, *(np.empty_like(_warmup) for _ in range(4)))
+    del _dtype, _warmup
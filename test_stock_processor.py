@@ -2,18 +2,22 @@
 Test script to verify the stock data processor functionality.
 This script can be used to test the processor with sample data or validate outputs.
 """
+import tempfile
 import pandas as pd
 import numpy as np
+import pytest
 from pathlib import Path
-from datetime import datetime, timedelta
 
 from stock_data_processor import (
     load_stock_data,
     aggregate_monthly_ohlc,
     add_technical_indicators,
     calculate_sma,
-    calculate_ema
+    calculate_ema,
+    write_ticker_to_csv
 )
+from stock_data_processor import technical_indicators
+from stock_data_processor.file_writer import PYARROW_AVAILABLE, _write_csv_arrow
 
 
 def create_sample_data(output_file: str = "sample_stock_data.csv"):
@@ -23,52 +27,37 @@ def create_sample_data(output_file: str = "sample_stock_data.csv"):
     """
     tickers = ['AAPL', 'AMD', 'AMZN', 'AVGO', 'CSCO', 'MSFT', 'NFLX', 'PEP', 'TMUS', 'TSLA']
     
-    # Generate 2 years of trading days (approximately 252 trading days per year)
-    start_date = datetime(2022, 1, 1)
-    dates = []
-    current_date = start_date
-    
-    # Generate approximately 504 trading days (2 years)
-    while len(dates) < 504:
-        # Skip weekends
-        if current_date.weekday() < 5:  # Monday = 0, Friday = 4
-            dates.append(current_date)
-        current_date += timedelta(days=1)
-        if len(dates) >= 504:
-            break
-    
-    # Create sample data
-    data = []
-    np.random.seed(42)  # For reproducibility
-    
-    for ticker in tickers:
-        base_price = np.random.uniform(50, 500)
-        
-        for date in dates:
-            # Generate realistic price movements
-            change = np.random.uniform(-0.05, 0.05)
-            base_price = base_price * (1 + change)
-            
-            open_price = base_price
-            high_price = base_price * (1 + np.random.uniform(0, 0.03))
-            low_price = base_price * (1 - np.random.uniform(0, 0.03))
-            close_price = base_price * (1 + np.random.uniform(-0.02, 0.02))
-            adjclose = close_price * np.random.uniform(0.98, 1.02)
-            volume = int(np.random.uniform(1000000, 10000000))
-            
-            data.append({
-                'date': date,
-                'ticker': ticker,
-                'open': round(open_price, 2),
-                'high': round(high_price, 2),
-                'low': round(low_price, 2),
-                'close': round(close_price, 2),
-                'adjclose': round(adjclose, 2),
-                'volume': volume
-            })
-    
-    df = pd.DataFrame(data)
-    df = df.sort_values(['ticker', 'date'])
+    # Generate 504 trading days (2 years of weekdays, ~252 per year)
+    n_tickers, n_days = len(tickers), 504
+    dates = pd.bdate_range('2022-01-01', periods=n_days)
+    
+    # Draw every random value in one vectorized call per column,
+    # one row per ticker and one column per day
+    rng = np.random.default_rng(42)  # For reproducibility
+    shape = (n_tickers, n_days)
+    
+    # Generate realistic price movements as a compounded random walk
+    starting_price = rng.uniform(50, 500, size=n_tickers)
+    changes = rng.uniform(-0.05, 0.05, size=shape)
+    base_price = starting_price[:, None] * np.cumprod(1 + changes, axis=1)
+    
+    high_price = base_price * (1 + rng.uniform(0, 0.03, size=shape))
+    low_price = base_price * (1 - rng.uniform(0, 0.03, size=shape))
+    close_price = base_price * (1 + rng.uniform(-0.02, 0.02, size=shape))
+    adjclose = close_price * rng.uniform(0.98, 1.02, size=shape)
+    volume = rng.uniform(1000000, 10000000, size=shape).astype(np.int64)
+    
+    # Rows come out ticker-major and date-ordered, so no sort is needed
+    df = pd.DataFrame({
+        'date': np.tile(dates, n_tickers),
+        'ticker': np.repeat(tickers, n_days),
+        'open': np.round(base_price.ravel(), 2),
+        'high': np.round(high_price.ravel(), 2),
+        'low': np.round(low_price.ravel(), 2),
+        'close': np.round(close_price.ravel(), 2),
+        'adjclose': np.round(adjclose.ravel(), 2),
+        'volume': volume.ravel()
+    })
     df.to_csv(output_file, index=False)
     print(f"Created sample dataset: {output_file} with {len(df)} rows")
     return output_file
@@ -86,8 +75,8 @@ def test_sma_calculation():
     # Manual calculation: (10+20+30+40+50)/5 = 30
     expected_first_sma = 30.0
     
-    print(f"Test prices: {test_prices.tolist()}")
-    print(f"SMA(5) values: {sma_5.tolist()}")
+    print(f"Test prices: {np.array2string(test_prices.to_numpy(), separator=', ')}")
+    print(f"SMA(5) values: {np.array2string(sma_5.to_numpy(), separator=', ')}")
     print(f"First SMA(5) value: {sma_5.iloc[4]:.2f} (expected: {expected_first_sma:.2f})")
     
     assert abs(sma_5.iloc[4] - expected_first_sma) < 0.01, "SMA calculation incorrect"
@@ -103,18 +92,98 @@ def test_ema_calculation():
     test_prices = pd.Series([10, 20, 30, 40, 50])
     ema_3 = calculate_ema(test_prices, window=3)
     
-    print(f"Test prices: {test_prices.tolist()}")
-    print(f"EMA(3) values: {[f'{x:.2f}' for x in ema_3.tolist()]}")
+    print(f"Test prices: {np.array2string(test_prices.to_numpy(), separator=', ')}")
+    print(f"EMA(3) values: {np.array2string(ema_3.to_numpy(), precision=2, floatmode='fixed', separator=', ')}")
     
     # Verify EMA is calculated (should be different from SMA)
     sma_3 = calculate_sma(test_prices, window=3)
-    print(f"SMA(3) values: {[f'{x:.2f}' for x in sma_3.tolist()]}")
+    print(f"SMA(3) values: {np.array2string(sma_3.to_numpy(), precision=2, floatmode='fixed', separator=', ')}")
     
     # EMA should be different from SMA (except possibly first value)
     assert not ema_3.equals(sma_3), "EMA should differ from SMA"
     print("[PASS] EMA calculation test passed")
 
 
+def test_technical_indicators_match_formulas():
+    """Test that the combined indicator pass matches the individual formulas."""
+    print("\n[Test] Technical Indicators")
+    print("-" * 40)
+    
+    # 30 months so both the 10 and 20 period windows fill up
+    dates = pd.date_range('2020-01-31', periods=30, freq='ME')
+    test_data = pd.DataFrame({'close': np.linspace(100, 158, 30)}, index=dates)
+    
+    result = add_technical_indicators(test_data)
+    
+    for window in (10, 20):
+        expected_sma = calculate_sma(test_data['close'], window=window)
+        expected_ema = calculate_ema(test_data['close'], window=window)
+        print(f"SMA_{window} last value: {result[f'SMA_{window}'].iloc[-1]:.4f} "
+              f"(expected: {expected_sma.iloc[-1]:.4f})")
+        print(f"EMA_{window} last value: {result[f'EMA_{window}'].iloc[-1]:.4f} "
+              f"(expected: {expected_ema.iloc[-1]:.4f})")
+        
+        assert np.allclose(result[f'SMA_{window}'], expected_sma), f"SMA_{window} mismatch"
+        assert np.allclose(result[f'EMA_{window}'], expected_ema), f"EMA_{window} mismatch"
+    print("[PASS] Technical indicators test passed")
+
+
+def test_indicator_dtypes():
+    """Test that SMA/EMA keep float32 input as float32 and return float64 otherwise."""
+    print("\n[Test] Indicator Dtypes")
+    print("-" * 40)
+    
+    # 5 points take the rolling SMA path, 100 points the cumulative-sum path
+    for n in (5, 100):
+        prices = pd.Series(np.linspace(100, 200, n))
+        for dtype, expected in ((np.float32, np.float32), (np.float64, np.float64), (np.int64, np.float64)):
+            series = prices.astype(dtype)
+            sma = calculate_sma(series, window=10)
+            ema = calculate_ema(series, window=10)
+            print(f"{n} x {np.dtype(dtype).name}: SMA {sma.dtype}, EMA {ema.dtype}")
+            
+            assert sma.dtype == expected, f"SMA dtype should be {np.dtype(expected).name}"
+            assert ema.dtype == expected, f"EMA dtype should be {np.dtype(expected).name}"
+    print("[PASS] Indicator dtypes test passed")
+
+
+def test_ema_nan_input():
+    """Test that EMA handles NaN prices the same way with and without numba."""
+    print("\n[Test] EMA with NaN Prices")
+    print("-" * 40)
+    
+    nan = np.nan
+    cases = [
+        # NaN before the seed is skipped by the initial SMA
+        ([1.0, nan, 3.0] + list(range(30)), {9: 2.7778, 10: 3.5455, 32: 24.5126}),
+        # NaN after the seed makes every later value NaN
+        (list(range(15)) + [nan] + list(range(15)), {9: 4.5, 14: 9.5, 15: nan, 30: nan}),
+        # An all-NaN first window leaves no seed
+        ([nan] * 10 + list(range(5)), {9: nan, 14: nan}),
+    ]
+    
+    # Force the pandas fallback first, then the Numba kernel when installed
+    backends = [False] + ([True] if technical_indicators.NUMBA_AVAILABLE else [])
+    numba_available = technical_indicators.NUMBA_AVAILABLE
+    try:
+        for use_numba in backends:
+            technical_indicators.NUMBA_AVAILABLE = use_numba
+            for prices, expected in cases:
+                series = pd.Series(prices, dtype=np.float64)
+                ema = calculate_ema(series, window=10).to_numpy()
+                ema_10 = add_technical_indicators(series.to_frame('close'))['EMA_10'].to_numpy()
+                got = {i: round(float(ema[i]), 4) for i in expected}
+                print(f"numba={use_numba}: {got}")
+                
+                for i, value in expected.items():
+                    assert np.isclose(ema[i], value, atol=1e-4, equal_nan=True), \
+                        f"EMA[{i}] should be {value} (numba={use_numba})"
+                assert np.allclose(ema_10, ema, equal_nan=True), "EMA_10 should match calculate_ema"
+    finally:
+        technical_indicators.NUMBA_AVAILABLE = numba_available
+    print("[PASS] EMA NaN input test passed")
+
+
 def test_monthly_aggregation():
     """Test monthly aggregation logic."""
     print("\n[Test] Monthly Aggregation")
@@ -148,6 +217,117 @@ def test_monthly_aggregation():
     print("[PASS] Monthly aggregation test passed")
 
 
+def test_monthly_aggregation_unsorted_input():
+    """Test that monthly aggregation sorts input that is not ticker/date ordered."""
+    print("\n[Test] Monthly Aggregation (unsorted input)")
+    print("-" * 40)
+    
+    # Two tickers over January and February, prices rising by one per day
+    # and offset by 1000 for the second ticker
+    dates = pd.bdate_range('2022-01-01', '2022-02-28', name='date')
+    n = len(dates)
+    base = np.arange(n, dtype=np.float64)
+    frames = [
+        pd.DataFrame({
+            'ticker': ticker,
+            'open': 100 + offset + base,
+            'high': 105 + offset + base,
+            'low': 95 + offset + base,
+            'close': 102 + offset + base,
+            'adjclose': 102 + offset + base,
+            'volume': np.full(n, 1000000, dtype=np.int64)
+        }, index=dates)
+        for ticker, offset in (('AAA', 0), ('BBB', 1000))
+    ]
+    sorted_data = pd.concat(frames)
+    expected = aggregate_monthly_ohlc(sorted_data)
+    
+    # Reverse date order, and dates interleaved across tickers
+    reversed_data = sorted_data.iloc[::-1]
+    interleaved = sorted_data.sort_index(kind='stable')
+    
+    for label, unsorted in (('reversed', reversed_data), ('interleaved', interleaved)):
+        monthly = aggregate_monthly_ohlc(unsorted)
+        print(f"{label}: first month open {monthly.iloc[0]['open']}, "
+              f"close {monthly.iloc[0]['close']}")
+        pd.testing.assert_frame_equal(monthly, expected)
+    
+    january = expected.iloc[0]
+    assert expected['ticker'].tolist() == ['AAA', 'AAA', 'BBB', 'BBB'], "Rows should be sorted by ticker"
+    assert expected.index[0] < expected.index[1], "Months should be in date order within a ticker"
+    assert january['open'] == 100, "Open should be first day's open"
+    assert january['close'] == 122, "Close should be last day's close"
+    print("[PASS] Monthly aggregation unsorted input test passed")
+
+
+@pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow is required for Parquet output")
+def test_parquet_output():
+    """Test that Parquet output round-trips the same columns as CSV."""
+    print("\n[Test] Parquet Output")
+    print("-" * 40)
+    
+    dates = pd.date_range('2022-01-31', periods=3, freq='ME', name='date')
+    test_data = pd.DataFrame({
+        'ticker': 'TEST',
+        'open': [100.0, 101.0, 102.0],
+        'high': [105.0, 106.0, 107.0],
+        'low': [95.0, 96.0, 97.0],
+        'close': [102.0, 103.0, 104.0],
+        'adjclose': [102.0, 103.0, 104.0],
+        'volume': [1000000, 1000000, 1000000]
+    }, index=dates)
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        csv_path = write_ticker_to_csv(test_data, 'TEST', output_dir)
+        parquet_path = write_ticker_to_csv(test_data, 'TEST', output_dir, output_format='parquet')
+        
+        from_csv = pd.read_csv(csv_path, parse_dates=['date'])
+        from_parquet = pd.read_parquet(parquet_path)
+    
+    print(f"Parquet file: {Path(parquet_path).name}")
+    print(f"Parquet columns: {from_parquet.columns.tolist()}")
+    
+    assert Path(parquet_path).suffix == '.parquet', "Parquet file should use .parquet suffix"
+    assert from_parquet.columns.tolist() == from_csv.columns.tolist(), "Columns should match CSV output"
+    assert np.allclose(from_parquet['close'], from_csv['close']), "Values should match CSV output"
+    print("[PASS] Parquet output test passed")
+
+
+@pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow is required for the Arrow CSV writer")
+def test_arrow_csv_layout():
+    """Test that the Arrow CSV writer keeps the to_csv header and date layout."""
+    print("\n[Test] Arrow CSV Layout")
+    print("-" * 40)
+    
+    test_data = pd.DataFrame({
+        'date': pd.date_range('2022-01-31', periods=3, freq='ME'),
+        'open': [100.0, 101.5, 102.0],
+        'close': [102.0, 103.25, 104.0],
+        'volume': [1000000, 1000000, 1000000]
+    })
+    
+    with tempfile.TemporaryDirectory() as output_dir:
+        file_path = Path(output_dir) / 'result_TEST.csv'
+        _write_csv_arrow(test_data, file_path)
+        arrow_lines = file_path.read_text().splitlines()
+    pandas_lines = test_data.to_csv(index=False).splitlines()
+    
+    print(f"Arrow:  {arrow_lines[:2]}")
+    print(f"pandas: {pandas_lines[:2]}")
+    
+    arrow_rows = [line.split(',') for line in arrow_lines[1:]]
+    pandas_rows = [line.split(',') for line in pandas_lines[1:]]
+    
+    assert arrow_lines[0] == pandas_lines[0], "Header should match to_csv (unquoted)"
+    assert [row[0] for row in arrow_rows] == [row[0] for row in pandas_rows], \
+        "Dates should be written as YYYY-MM-DD like to_csv"
+    assert not any(field.endswith('.0') for row in arrow_rows for field in row[1:]), \
+        "Integral floats should be written without a trailing .0"
+    assert np.allclose(np.array(arrow_rows)[:, 1:].astype(float), np.array(pandas_rows)[:, 1:].astype(float)), \
+        "Values should match to_csv"
+    print("[PASS] Arrow CSV layout test passed")
+
+
 if __name__ == "__main__":
     print("=" * 60)
     print("Stock Data Processor - Test Suite")
@@ -156,7 +336,16 @@ if __name__ == "__main__":
     # Run tests
     test_sma_calculation()
     test_ema_calculation()
+    test_technical_indicators_match_formulas()
+    test_indicator_dtypes()
+    test_ema_nan_input()
     test_monthly_aggregation()
+    test_monthly_aggregation_unsorted_input()
+    if PYARROW_AVAILABLE:
+        test_parquet_output()
+        test_arrow_csv_layout()
+    else:
+        print("\n[SKIP] Parquet output and Arrow CSV tests (pyarrow not installed)")
     
     print("\n" + "=" * 60)
     print("All tests passed!")